@@ -5,21 +5,28 @@
     @Date: 2024/11/11 12:31
     @Description: Prometheus metrics monitoring and notification system
 """
+import asyncio
+import hashlib
 import logging
+import math
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
 from datetime import datetime
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
-from email.mime.base import MIMEBase
-from email import encoders
+from email import policy
+from email.message import EmailMessage
 import smtplib
+import ssl
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Optional, List, Dict, Any
-import yaml
+from typing import Final, Optional, List, Dict, Any, Iterable, Iterator, Tuple, TypeVar
 
-import requests
-import pandas as pd
+import aiohttp
+import orjson
 from jinja2 import Environment, FileSystemLoader
+from openpyxl import Workbook
 
 # Configure logging
 logging.basicConfig(
@@ -28,6 +35,34 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+T = TypeVar('T')
+
+# Upper bound on concurrent Prometheus connections
+MAX_CONNECTIONS = 32
+
+# Human-readable units and their divisors for byte sizes and bit rates
+_UNITS_BYTES = ('B', 'KB', 'MB', 'GB', 'TB', 'PB')
+_DIVS_BYTES = [1024 ** i for i in range(len(_UNITS_BYTES))]
+_UNITS_BPS = ('bps', 'Kbps', 'Mbps', 'Gbps', 'Tbps')
+_DIVS_BPS = [1000 ** i for i in range(len(_UNITS_BPS))]
+
+# PromQL queries, built once at import; identical text every run is what the local response cache keys on
+QUERY_NODES: Final[str] = sys.intern('node_uname_info{vendor=~"",account=~"",group=~"()",name=~"()",name=~".*.*"} - 0')
+QUERY_DISK_SIZE: Final[str] = sys.intern('node_filesystem_size_bytes{fstype=~"ext.*|xfs|nfs",mountpoint !~".*pod.*"}')
+QUERY_DISK_FREE: Final[str] = sys.intern('node_filesystem_free_bytes{fstype=~"ext.*|xfs|nfs",mountpoint !~".*pod.*"}')
+QUERY_CPU_USAGE_PERCENT: Final[str] = sys.intern('(1 - avg(irate(node_cpu_seconds_total{mode=~"idle"}[3m])) by (instance)) * 100')
+QUERY_CPU_CORE_NUM: Final[str] = sys.intern('count(node_cpu_seconds_total{mode="system"}) by (instance)')
+QUERY_MEM_TOTAL: Final[str] = sys.intern('node_memory_MemTotal_bytes')
+QUERY_MEM_AVAIL: Final[str] = sys.intern('node_memory_MemAvailable_bytes')
+QUERY_NET_RX: Final[str] = sys.intern('max(irate(node_network_receive_bytes_total{device=~"eth.*|ens.*"}[3m])*8) by (instance)')
+QUERY_NET_TX: Final[str] = sys.intern('max(irate(node_network_transmit_bytes_total{device=~"eth.*|ens.*"}[3m])*8) by (instance)')
+
+# Per-user cache location; a shared directory like /tmp would let other local users plant responses
+_DEFAULT_CACHE_DIR = os.path.join(os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache'), 'prometheus_notice')
+
+# Shared template environment; templates are loaded once and never re-checked on disk
+_JINJA_ENV = Environment(loader=FileSystemLoader('templates'), auto_reload=False, cache_size=-1)
+
 @dataclass
 class EmailConfig:
     """Email configuration settings"""
@@ -38,12 +73,26 @@ class EmailConfig:
     password: str
     subject: str
     recipients: List[str]
+    use_ssl: bool = True
+
+
+@dataclass
+class PrometheusConfig:
+    """Prometheus connection and response cache settings"""
+    url: str
+    # Seconds a cached query response stays valid, 0 disables the cache
+    cache_ttl: int = 30
+    cache_dir: str = _DEFAULT_CACHE_DIR
+    # Hard cap on report rows per metric type; only capped series are formatted into rows,
+    # so a label cardinality explosion costs one small tuple per series, not one row dict
+    max_series: int = 10_000
 
 
 class EmailSender:
     """Handles email sending functionality"""
     def __init__(self, config: EmailConfig):
         self.config = config
+        self._smtp: Optional[smtplib.SMTP] = None
 
     def send(self, subject: str, body: str, html: bool = False, attachments: Optional[List[Path]] = None) -> bool:
         """Send an email with optional HTML content and attachments"""
@@ -55,177 +104,339 @@ class EmailSender:
             logger.error(f"Failed to send email: {e}")
             return False
 
-    def _create_message(self, subject: str, body: str, html: bool) -> MIMEMultipart:
-        message = MIMEMultipart()
+    def _create_message(self, subject: str, body: str, html: bool) -> EmailMessage:
+        # SMTP policy so as_bytes()/as_string() also give CRLF, matching what send_message puts on the wire
+        message = EmailMessage(policy=policy.SMTP)
         message["From"] = f"{self.config.from_name} <{self.config.username}>"
         message["To"] = ", ".join(self.config.recipients)
         message["Subject"] = subject
         
         content_type = "html" if html else "plain"
-        message.attach(MIMEText(body, content_type))
+        message.set_content(body, subtype=content_type)
         return message
 
-    def _add_attachments(self, message: MIMEMultipart, attachments: Optional[List[Path]]) -> None:
+    def _add_attachments(self, message: EmailMessage, attachments: Optional[List[Path]]) -> None:
         if not attachments:
             return
             
         for file_path in attachments:
             try:
-                with open(file_path, "rb") as f:
-                    part = MIMEBase("application", "octet-stream")
-                    part.set_payload(f.read())
-                    encoders.encode_base64(part)
-                    part.add_header(
-                        "Content-Disposition",
-                        f"attachment; filename={file_path.name}"
-                    )
-                    message.attach(part)
+                message.add_attachment(
+                    file_path.read_bytes(),
+                    maintype="application",
+                    subtype="octet-stream",
+                    filename=file_path.name
+                )
             except Exception as e:
                 logger.error(f"Error attaching file {file_path}: {e}")
 
-    def _send_message(self, message: MIMEMultipart) -> bool:
+    def connect(self) -> None:
+        """Open the SMTP connection ahead of time so a later send can reuse it"""
+        self._get_connection()
+
+    def _get_connection(self) -> smtplib.SMTP:
+        """Return a logged-in SMTP connection, reusing the previous one while it is alive"""
+        if self._smtp is not None:
+            try:
+                if self._smtp.noop()[0] == 250:
+                    return self._smtp
+            except (smtplib.SMTPException, OSError):
+                pass
+            self.close()
+
+        context = ssl.create_default_context()
+        server: smtplib.SMTP
+        if self.config.use_ssl:
+            # Implicit TLS skips the EHLO/STARTTLS round trips
+            server = smtplib.SMTP_SSL(self.config.smtp_server, self.config.smtp_port, context=context)
+        else:
+            server = smtplib.SMTP(self.config.smtp_server, self.config.smtp_port)
         try:
-            # with smtplib.SMTP(self.config.smtp_server, self.config.smtp_port) as server:
-            with smtplib.SMTP_SSL(self.config.smtp_server) as server:
-                # server.starttls()
-                server.login(self.config.username, self.config.password)
-                server.sendmail(
-                    self.config.username,
-                    self.config.recipients,
-                    message.as_string()
-                )
+            if not self.config.use_ssl:
+                server.starttls(context=context)
+            server.login(self.config.username, self.config.password)
+        except Exception:
+            server.close()
+            raise
+        self._smtp = server
+        return server
+
+    def _send_message(self, message: EmailMessage) -> bool:
+        try:
+            server = self._get_connection()
+            server.send_message(
+                message,
+                from_addr=self.config.username,
+                to_addrs=self.config.recipients
+            )
             logger.info("Email sent successfully!")
             return True
         except Exception as e:
             logger.error(f"Error sending email: {e}")
+            # The connection state is unknown after a failure, reconnect next time
+            self.close()
             return False
 
+    def close(self) -> None:
+        """Close the cached SMTP connection, if any"""
+        if self._smtp is None:
+            return
+        try:
+            self._smtp.quit()
+        except (smtplib.SMTPException, OSError):
+            self._smtp.close()
+        finally:
+            self._smtp = None
 
 class PrometheusMetrics:
     """Collects and processes Prometheus metrics"""
-    def __init__(self, url: str):
-        self.url = url
+    def __init__(self, config: PrometheusConfig):
+        self.config = config
+        self.url = config.url
         self.node_list: List[str] = []
         self.disk_list: List[Dict[str, Any]] = []
         self.cpu_list: List[Dict[str, Any]] = []
         self.mem_list: List[Dict[str, Any]] = []
         self.net_list: List[Dict[str, Any]] = []
-        self.jinja_env = Environment(loader=FileSystemLoader('templates'))
+        self._template = _JINJA_ENV.get_template('prometheus_report_zh.html')
+
+    async def _query_prometheus(self, session: aiohttp.ClientSession, query: str) -> Dict:
+        """Make a query to Prometheus API, answering from the on-disk cache while it is fresh"""
+        cache_path = self._cache_path(query)
+        # Cache file I/O runs in a worker thread so it does not stall the other queries
+        cached = await asyncio.to_thread(self._read_cache, cache_path)
+        if cached is not None:
+            return cached
 
-    def _query_prometheus(self, query: str) -> Dict:
-        """Make a query to Prometheus API"""
         try:
-            response = requests.get(self.url, params={"query": query}, timeout=10)
-            response.raise_for_status()
-            return response.json()
+            async with session.get(self.url, params={"query": query}) as response:
+                response.raise_for_status()
+                body = await response.read()
+            result = orjson.loads(body)
         except Exception as e:
             logger.error(f"Failed to query Prometheus: {e}")
             return {"data": {"result": []}}
 
-    def get_node_metrics(self) -> None:
+        await asyncio.to_thread(self._write_cache, cache_path, body)
+        return result
+
+    def _cache_path(self, query: str) -> Path:
+        key = hashlib.blake2b((self.url + query).encode(), digest_size=16).hexdigest()
+        return Path(self.config.cache_dir) / f"{key}.json"
+
+    def _read_cache(self, cache_path: Path) -> Optional[Dict]:
+        """Return the cached response if it is younger than cache_ttl"""
+        if self.config.cache_ttl <= 0:
+            return None
+        try:
+            if time.time() - cache_path.stat().st_mtime >= self.config.cache_ttl:
+                return None
+            cached = orjson.loads(cache_path.read_bytes())
+        except (OSError, orjson.JSONDecodeError):
+            return None
+        # Anything without the query result shape is treated as a miss
+        data = cached.get("data") if isinstance(cached, dict) else None
+        if not isinstance(data, dict) or not isinstance(data.get("result"), list):
+            return None
+        return cached
+
+    def _write_cache(self, cache_path: Path, body: bytes) -> None:
+        if self.config.cache_ttl <= 0:
+            return
+        try:
+            cache_path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+            # Write then rename so concurrent runs never read a partial file
+            tmp_path = cache_path.with_suffix(f".{os.getpid()}.tmp")
+            tmp_path.write_bytes(body)
+            os.replace(tmp_path, cache_path)
+        except OSError as e:
+            logger.warning(f"Failed to cache Prometheus response: {e}")
+
+    async def get_node_metrics(self, session: aiohttp.ClientSession) -> None:
         """Get list of nodes from Prometheus"""
-        query = 'node_uname_info{vendor=~"",account=~"",group=~"()",name=~"()",name=~".*.*"} - 0'
-        result = self._query_prometheus(query)
+        result = await self._query_prometheus(session, QUERY_NODES)
         self.node_list = [node["metric"]["instance"] for node in result["data"]["result"]]
 
-    def get_disk_metrics(self, instance: str) -> None:
-        """Get disk metrics for a specific node"""
-        query_size = f'node_filesystem_size_bytes{{instance=~"{instance}",fstype=~"ext.*|xfs|nfs",mountpoint !~".*pod.*"}}'
-        query_free = f'node_filesystem_free_bytes{{instance=~"{instance}",fstype=~"ext.*|xfs|nfs",mountpoint !~".*pod.*"}}'
-        
-        result_size = self._query_prometheus(query_size)
-        result_free = self._query_prometheus(query_free)
-        
-        for size, free in zip(result_size["data"]["result"], result_free["data"]["result"]):
-            size_value = float(size["value"][1])
-            free_value = float(free["value"][1])
-            used_value = size_value - free_value
-            usage_percent = (used_value / size_value * 100) if size_value > 0 else 0
-
-            self.disk_list.append({
-                "instance": instance,
-                "device": size["metric"]["device"],
-                "mount_point": size["metric"]["mountpoint"],
-                "size": self._format_bytes(size_value),
-                "used": self._format_bytes(used_value),
-                "free": self._format_bytes(free_value),
-                "usage_percent": usage_percent,
-            })
-
-    def get_cpu_metrics(self, instance: str) -> None:
-        """Get CPU metrics for a specific node"""
-        query_usage_percent = f'(1 - avg(irate(node_cpu_seconds_total{{instance=~"{instance}",mode=~"idle"}}[3m])) by (instance)) * 100'
-        query_core_num = f'count(node_cpu_seconds_total{{instance=~"{instance}",mode="system"}}) by (instance)'
-
-        result_usage_percent = self._query_prometheus(query_usage_percent)
-        result_core_num = self._query_prometheus(query_core_num)
-
-        for usage_percent, core_num in zip(result_usage_percent["data"]["result"], result_core_num["data"]["result"]):
-            usage_value = float(usage_percent["value"][1])
-            core_num_value = float(core_num["value"][1])
-            self.cpu_list.append({
-                "instance": instance,
-                "core_num": core_num_value,
-                "usage_percent": usage_value
-            })
-
-    def get_mem_metrics(self, instance: str) -> None:
-        """Get memory metrics for a specific node"""
-        query_total = f'node_memory_MemTotal_bytes{{instance=~"{instance}"}}'
-        query_avail = f'node_memory_MemAvailable_bytes{{instance=~"{instance}"}}'
-        
-        result_total = self._query_prometheus(query_total)
-        result_avail = self._query_prometheus(query_avail)
-        
-        for total, avail in zip(result_total["data"]["result"], result_avail["data"]["result"]):
-            total_value = float(total["value"][1])
-            used_value = total_value - float(avail["value"][1])
-            usage_percent = (used_value / total_value * 100) if total_value > 0 else 0
-            
-            self.mem_list.append({
-                "instance": instance,
-                "total": self._format_bytes(total_value),
-                "used": self._format_bytes(used_value),
-                "usage_percent": usage_percent
-            })
-
-    def get_net_metrics(self, instance: str) -> None:
-        """Get network metrics for a specific node"""
-        query_rx = f'max(irate(node_network_receive_bytes_total{{instance=~"{instance}",device=~"eth.*|ens.*"}}[3m])*8) by (instance)'
-        query_tx = f'max(irate(node_network_transmit_bytes_total{{instance=~"{instance}",device=~"eth.*|ens.*"}}[3m])*8) by (instance)'
-        
-        result_rx = self._query_prometheus(query_rx)
-        result_tx = self._query_prometheus(query_tx)
-        
-        for rx, tx in zip(result_rx["data"]["result"], result_tx["data"]["result"]):
-            self.net_list.append({
-                "instance": instance,
-                "download": self._format_bits_per_second(float(rx["value"][1])),
-                "upload": self._format_bits_per_second(float(tx["value"][1]))
-            })
+    def collect_metrics(self) -> None:
+        """Collect the node list and disk, CPU, memory and network metrics for all nodes"""
+        asyncio.run(self._collect_all())
+
+    async def _collect_all(self) -> None:
+        """Issue every Prometheus query concurrently over one pooled client session"""
+        connector = aiohttp.TCPConnector(limit=MAX_CONNECTIONS)
+        timeout = aiohttp.ClientTimeout(total=10)
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+            _, disk_values, cpu_values, mem_values, net_values = await asyncio.gather(
+                self.get_node_metrics(session),
+                self.get_disk_metrics(session),
+                self.get_cpu_metrics(session),
+                self.get_mem_metrics(session),
+                self.get_net_metrics(session),
+            )
+
+        # Merge raw values in node order so the report stays stable, then cap before formatting
+        # so series from instances outside node_list never use up the budget and at most
+        # max_series rows per metric are ever built
+        disks = self._cap_series("disk", (
+            (node, *disk) for node in self.node_list for disk in disk_values.get(node, ())
+        ))
+        cpus = self._cap_series("CPU", ((node, cpu_values[node]) for node in self.node_list if node in cpu_values))
+        mems = self._cap_series("memory", ((node, mem_values[node]) for node in self.node_list if node in mem_values))
+        nets = self._cap_series("network", ((node, net_values[node]) for node in self.node_list if node in net_values))
+
+        self.disk_list = [self._disk_row(*disk) for disk in disks]
+        self.cpu_list = [self._cpu_row(node, *values) for node, values in cpus]
+        self.mem_list = [self._mem_row(node, *values) for node, values in mems]
+        self.net_list = [self._net_row(node, *values) for node, values in nets]
+
+    def _cap_series(self, kind: str, series: Iterable[T]) -> List[T]:
+        """Keep at most max_series series, warning when the limit truncates a metric"""
+        capped = list(islice(series, self.config.max_series + 1))
+        if len(capped) > self.config.max_series:
+            logger.warning(f"Too many {kind} series, keeping the first {self.config.max_series}")
+            del capped[self.config.max_series:]
+        return capped
+
+    @staticmethod
+    def _usage(total: float, free: float) -> Tuple[float, float]:
+        """Return used amount and usage percentage from total and free amounts"""
+        used = total - free
+        return used, (used / total * 100) if total > 0 else 0
+
+    @staticmethod
+    def _iter_series(result: Dict, *labels: str) -> Iterator[Tuple[tuple, float]]:
+        """Yield (label values, value) for each series of a query result"""
+        for series in result["data"]["result"]:
+            yield tuple(series["metric"].get(label, "") for label in labels), float(series["value"][1])
+
+    @staticmethod
+    def _series_values(result: Dict, *labels: str) -> Dict[tuple, float]:
+        """Map each series of a query result to its value, keyed by the given labels"""
+        return dict(PrometheusMetrics._iter_series(result, *labels))
+
+    async def get_disk_metrics(self, session: aiohttp.ClientSession) -> Dict[str, List[Tuple[str, str, float, float]]]:
+        """Get (device, mount point, size, free) of every disk, grouped by instance"""
+        result_size, result_free = await asyncio.gather(
+            self._query_prometheus(session, QUERY_DISK_SIZE),
+            self._query_prometheus(session, QUERY_DISK_FREE),
+        )
+        free_values = self._series_values(result_free, "instance", "device", "mountpoint")
+
+        values: Dict[str, List[Tuple[str, str, float, float]]] = {}
+        for key, size_value in self._iter_series(result_size, "instance", "device", "mountpoint"):
+            if key not in free_values:
+                continue
+            instance, device, mount_point = key
+            values.setdefault(instance, []).append((device, mount_point, size_value, free_values[key]))
+        return values
+
+    async def get_cpu_metrics(self, session: aiohttp.ClientSession) -> Dict[str, Tuple[float, float]]:
+        """Get (usage percent, core count) of every node, keyed by instance"""
+        result_usage_percent, result_core_num = await asyncio.gather(
+            self._query_prometheus(session, QUERY_CPU_USAGE_PERCENT),
+            self._query_prometheus(session, QUERY_CPU_CORE_NUM),
+        )
+        core_num_values = self._series_values(result_core_num, "instance")
+        return {
+            instance: (usage_value, core_num_values[(instance,)])
+            for (instance,), usage_value in self._iter_series(result_usage_percent, "instance")
+            if (instance,) in core_num_values
+        }
+
+    async def get_mem_metrics(self, session: aiohttp.ClientSession) -> Dict[str, Tuple[float, float]]:
+        """Get (total, available) memory of every node, keyed by instance"""
+        result_total, result_avail = await asyncio.gather(
+            self._query_prometheus(session, QUERY_MEM_TOTAL),
+            self._query_prometheus(session, QUERY_MEM_AVAIL),
+        )
+        avail_values = self._series_values(result_avail, "instance")
+        return {
+            instance: (total_value, avail_values[(instance,)])
+            for (instance,), total_value in self._iter_series(result_total, "instance")
+            if (instance,) in avail_values
+        }
+
+    async def get_net_metrics(self, session: aiohttp.ClientSession) -> Dict[str, Tuple[float, float]]:
+        """Get (receive, transmit) bit rates of every node, keyed by instance"""
+        result_rx, result_tx = await asyncio.gather(
+            self._query_prometheus(session, QUERY_NET_RX),
+            self._query_prometheus(session, QUERY_NET_TX),
+        )
+        tx_values = self._series_values(result_tx, "instance")
+        return {
+            instance: (rx_value, tx_values[(instance,)])
+            for (instance,), rx_value in self._iter_series(result_rx, "instance")
+            if (instance,) in tx_values
+        }
+
+    def _disk_row(self, instance: str, device: str, mount_point: str, size: float, free: float) -> Dict[str, Any]:
+        used, usage_percent = self._usage(size, free)
+        return {
+            "instance": instance,
+            "device": device,
+            "mount_point": mount_point,
+            "size": self._format_bytes(size),
+            "used": self._format_bytes(used),
+            "free": self._format_bytes(free),
+            "usage_percent": usage_percent,
+        }
+
+    @staticmethod
+    def _cpu_row(instance: str, usage_percent: float, core_num: float) -> Dict[str, Any]:
+        return {
+            "instance": instance,
+            "core_num": core_num,
+            "usage_percent": usage_percent
+        }
+
+    def _mem_row(self, instance: str, total: float, avail: float) -> Dict[str, Any]:
+        used, usage_percent = self._usage(total, avail)
+        return {
+            "instance": instance,
+            "total": self._format_bytes(total),
+            "used": self._format_bytes(used),
+            "usage_percent": usage_percent
+        }
+
+    def _net_row(self, instance: str, rx: float, tx: float) -> Dict[str, Any]:
+        return {
+            "instance": instance,
+            "download": self._format_bits_per_second(rx),
+            "upload": self._format_bits_per_second(tx)
+        }
+
+    @staticmethod
+    def _bps_unit_index(bps: float) -> int:
+        """Index of the largest bit-rate unit whose divisor does not exceed bps"""
+        # NaN and +Inf (both valid Prometheus sample values) stay in the base unit
+        if not math.isfinite(bps) or bps < 1000:
+            return 0
+        index = min(int(math.log(bps, 1000)), len(_DIVS_BPS) - 1)
+        # math.log is not exact at unit boundaries, nudge by one if needed
+        if index + 1 < len(_DIVS_BPS) and bps >= _DIVS_BPS[index + 1]:
+            index += 1
+        elif bps < _DIVS_BPS[index]:
+            index -= 1
+        return index
 
     @staticmethod
     def _format_bytes(bytes_value: float) -> str:
         """Format bytes to human-readable format"""
-        for unit in ['B', 'KB', 'MB', 'GB', 'TB']:
-            if bytes_value < 1024:
-                return f"{bytes_value:.2f} {unit}"
-            bytes_value /= 1024
-        return f"{bytes_value:.2f} PB"
+        index = 0
+        if math.isfinite(bytes_value) and bytes_value >= 1:
+            # Units step by 2**10, so the index is floor(log2(value)) // 10, taken exactly from the bit length
+            index = min((int(bytes_value).bit_length() - 1) // 10, len(_DIVS_BYTES) - 1)
+        return f"{bytes_value / _DIVS_BYTES[index]:.2f} {_UNITS_BYTES[index]}"
 
     @staticmethod
     def _format_bits_per_second(bps: float) -> str:
         """Format bits per second to human-readable format"""
-        for unit in ['bps', 'Kbps', 'Mbps', 'Gbps']:
-            if bps < 1000:
-                return f"{bps:.2f} {unit}"
-            bps /= 1000
-        return f"{bps:.2f} Tbps"
+        index = PrometheusMetrics._bps_unit_index(bps)
+        return f"{bps / _DIVS_BPS[index]:.2f} {_UNITS_BPS[index]}"
 
     def generate_html_report(self) -> str:
         """Generate HTML report using template"""
-        template = self.jinja_env.get_template('prometheus_report_zh.html')
-        return template.render(
+        return self._template.render(
             nodes=self.node_list,
             disks=self.disk_list,
             cpus=self.cpu_list,
@@ -236,54 +447,64 @@ class PrometheusMetrics:
     
     def generate_excel_report(self, file_path: Path) -> None:
         """Generate Excel report file"""
-        # Prepare data for each metric type
-        disk_df = pd.DataFrame(self.disk_list)
-        cpu_df = pd.DataFrame(self.cpu_list) 
-        mem_df = pd.DataFrame(self.mem_list)
-        net_df = pd.DataFrame(self.net_list)
-
-        # Format usage percentages with % symbol
-        disk_df['usage_percent'] = disk_df['usage_percent'].apply(lambda x: f'{x:.2f}%')
-        cpu_df['usage_percent'] = cpu_df['usage_percent'].apply(lambda x: f'{x:.2f}%')
-        mem_df['usage_percent'] = mem_df['usage_percent'].apply(lambda x: f'{x:.2f}%')
-
-        # translate table header to chinese
-        disk_df.rename(columns={'instance': '节点', 'device': '设备', 'mount_point': '挂载点', 'size': '总大小', 'free': '剩余', 'used': '已用', 'usage_percent': '使用率'}, inplace=True)
-        cpu_df.rename(columns={'instance': '节点', 'usage_percent': '使用率', 'core_num': '核心数'}, inplace=True)
-        mem_df.rename(columns={'instance': '节点', 'total': '总大小', 'used': '已用', 'usage_percent': '使用率'}, inplace=True)
-        net_df.rename(columns={'instance': '节点', 'download': '下载', 'upload': '上传'}, inplace=True)
-
-        # Create Excel writer object
-        with pd.ExcelWriter(file_path) as writer:
-            # Write each DataFrame to a different sheet
-            disk_df.to_excel(writer, sheet_name='磁盘', index=False)
-            cpu_df.to_excel(writer, sheet_name='CPU', index=False)
-            mem_df.to_excel(writer, sheet_name='内存', index=False)
-            net_df.to_excel(writer, sheet_name='网络', index=False)
-            
+        # Sheet name, source rows and (field, chinese header) columns for each metric type
+        sheets = (
+            ('磁盘', self.disk_list, (('instance', '节点'), ('device', '设备'), ('mount_point', '挂载点'),
+                                     ('size', '总大小'), ('used', '已用'), ('free', '剩余'), ('usage_percent', '使用率'))),
+            ('CPU', self.cpu_list, (('instance', '节点'), ('core_num', '核心数'), ('usage_percent', '使用率'))),
+            ('内存', self.mem_list, (('instance', '节点'), ('total', '总大小'), ('used', '已用'), ('usage_percent', '使用率'))),
+            ('网络', self.net_list, (('instance', '节点'), ('download', '下载'), ('upload', '上传'))),
+        )
+
+        # Write-only workbook streams rows out instead of keeping them in memory
+        workbook = Workbook(write_only=True)
+        for sheet_name, rows, columns in sheets:
+            worksheet = workbook.create_sheet(sheet_name)
+            worksheet.append([header for _, header in columns])
+            for row in rows:
+                # Format usage percentages with % symbol
+                worksheet.append([
+                    f"{row[key]:.2f}%" if key == 'usage_percent' else row[key]
+                    for key, _ in columns
+                ])
+        workbook.save(file_path)
+
         logger.info(f"Excel report generated successfully at {file_path}")
         
 
 class PrometheusNotice:
     """Main class for Prometheus monitoring and notification"""
-    def __init__(self, config: EmailConfig, prometheus_url: str):
+    def __init__(self, config: EmailConfig, prometheus_config: PrometheusConfig):
         self.email_sender = EmailSender(config)
-        self.prometheus_metrics = PrometheusMetrics(prometheus_url)
+        self.prometheus_metrics = PrometheusMetrics(prometheus_config)
 
     def run(self) -> None:
         """Execute the monitoring and notification process"""
         try:
-            self.prometheus_metrics.get_node_metrics()
-            for node in self.prometheus_metrics.node_list:
-                self.prometheus_metrics.get_disk_metrics(node)
-                self.prometheus_metrics.get_cpu_metrics(node)
-                self.prometheus_metrics.get_mem_metrics(node)
-                self.prometheus_metrics.get_net_metrics(node)
+            self.prometheus_metrics.collect_metrics()
 
             excel_report_path = Path('report.xlsx')
-            self.prometheus_metrics.generate_excel_report(excel_report_path)
+            with ThreadPoolExecutor(max_workers=3) as executor:
+                # Open the SMTP connection while the reports are being generated
+                connect_future = executor.submit(self.email_sender.connect)
+                excel_future = executor.submit(self.prometheus_metrics.generate_excel_report, excel_report_path)
+                html_future = executor.submit(self.prometheus_metrics.generate_html_report)
+
+                excel_future.result()
+                html_report = html_future.result()
+                try:
+                    connect_future.result()
+                except (smtplib.SMTPConnectError, smtplib.SMTPServerDisconnected) as e:
+                    # Transient, send() retries the connection and reports the failure
+                    logger.warning(f"Failed to pre-connect to SMTP server: {e}")
+                except smtplib.SMTPException as e:
+                    # Authentication and protocol errors would fail again, a second AUTH can trip lockouts
+                    logger.error(f"SMTP login failed, report not sent: {e}")
+                    return
+                except OSError as e:
+                    # Network errors (refused, timeout, TLS) are worth one more attempt in send()
+                    logger.warning(f"Failed to pre-connect to SMTP server: {e}")
 
-            html_report = self.prometheus_metrics.generate_html_report()
             self.email_sender.send(
                 subject=self.email_sender.config.subject,
                 body=html_report,
@@ -292,13 +513,17 @@ class PrometheusNotice:
             )
         except Exception as e:
             logger.error(f"Failed to run monitoring: {e}")
+        finally:
+            self.email_sender.close()
 
 
 if __name__ == '__main__':
+    import yaml
+
     with open('config.yaml', 'r', encoding='utf-8') as f:
         config = yaml.safe_load(f)
     email_config = EmailConfig(**config['email'])
-    prometheus_url = config['prometheus']['url']
+    prometheus_config = PrometheusConfig(**config['prometheus'])
 
-    prometheus_notice = PrometheusNotice(email_config, prometheus_url)
+    prometheus_notice = PrometheusNotice(email_config, prometheus_config)
     prometheus_notice.run()
\ No newline at end of file